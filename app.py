@@ -1,14 +1,32 @@
 # app.py — Wasabi single-file uploader (forced session, path-style, deep debug)
-# 1) pip install boto3 flask
+# 1) pip install boto3 flask python-dotenv waitress
 # 2) Fill CONFIG section (use freshly rotated keys)
 # 3) python app.py → http://127.0.0.1:5050
 
+import base64
+import gzip
+import hashlib
+import html
+import logging
+import math
+import multiprocessing as mp
 import os
-import uuid
-from flask import Flask, request, render_template_string
-from werkzeug.utils import secure_filename
+import random
+import re
+import secrets
+import sys
+import time
+import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.client import HTTPConnection
+from xml.etree import ElementTree
+from flask import Flask, Response, request
 import boto3
+import urllib3.connection
 from boto3.session import Session
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
 from botocore.client import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
@@ -23,6 +41,19 @@ def _env(name: str, required: bool = True, default: str | None = None) -> str |
         return None
     v = v.strip()
     return v if v else None  # empty -> None
+
+# Debug output goes through logging; LOG_LEVEL=DEBUG shows the startup doctor
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("wasabi_uploader")
+# getLevelNamesMapping() is 3.11+; the README still supports 3.10
+_LEVELS = getattr(logging, "getLevelNamesMapping", lambda: dict(logging._nameToLevel))()
+LOG_LEVEL = (_env("LOG_LEVEL") or "WARNING").upper()
+if LOG_LEVEL in _LEVELS:
+    logger.setLevel(_LEVELS[LOG_LEVEL])
+else:
+    logger.setLevel(logging.WARNING)
+    logger.warning("Unknown LOG_LEVEL %r, using WARNING", LOG_LEVEL)
+
 # ==== CONFIG — FILL THESE EXACTLY (rotate your keys first) ===================
 WASABI_ACCESS_KEY = _env("WASABI_ACCESS_KEY")
 WASABI_SECRET_KEY = _env("WASABI_SECRET_KEY")
@@ -32,33 +63,105 @@ WASABI_BUCKET     = _env("WASABI_BUCKET")
 # ============================================================================
 
 # Remove any ambient AWS configuration that could override ours
-for k in [
+_AMBIENT = frozenset({
     "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN",
     "AWS_PROFILE", "AWS_DEFAULT_REGION", "AWS_REGION",
-    "AWS_SHARED_CREDENTIALS_FILE", "AWS_CONFIG_FILE"
-]:
-    os.environ.pop(k, None)
+    "AWS_SHARED_CREDENTIALS_FILE", "AWS_CONFIG_FILE",
+})
+for k in _AMBIENT & os.environ.keys():
+    del os.environ[k]
 
 def _mask(k: str) -> str:
     return f"{k[:4]}..{k[-4:]}" if k and len(k) > 8 else (k or "")
 
-# Build a dedicated session so nothing else leaks in
-session: Session = boto3.session.Session(
-    aws_access_key_id=WASABI_ACCESS_KEY.strip(),
-    aws_secret_access_key=WASABI_SECRET_KEY.strip(),
-    region_name=WASABI_REGION.strip(),
-)
-s3 = session.client(
-    "s3",
-    endpoint_url=WASABI_ENDPOINT.strip(),
-    config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+# Request bodies are written to the socket in `blocksize` chunks: urllib3 2.x passes its own
+# 16 KiB default to http.client, urllib3 1.26 leaves http.client's 8 KiB. Raise whichever
+# botocore's connections actually use, before any connection exists.
+SEND_BUFSIZE = int(_env("WASABI_SEND_BUFSIZE", default=str(1024 * 1024)))
+_u3_defaults = [
+    cls.__init__.__kwdefaults__ or {}
+    for cls in (urllib3.connection.HTTPConnection, urllib3.connection.HTTPSConnection)
+]
+if all("blocksize" in kw for kw in _u3_defaults):
+    for kw in _u3_defaults:
+        kw["blocksize"] = SEND_BUFSIZE
+else:
+    HTTPConnection.__init__.__defaults__ = tuple(
+        SEND_BUFSIZE if x == 8192 else x for x in HTTPConnection.__init__.__defaults__
+    )
+
+# Room for multipart parts from several concurrent uploads without dropping connections
+MAX_POOL = int(_env("WASABI_MAX_POOL", default="50"))
+
+# Attempts per S3 call, shared by botocore and the hand-rolled sendfile PUT
+RETRY_ATTEMPTS = 5
+
+# UNSIGNED-PAYLOAD over HTTPS skips the O(filesize) SHA-256 of every PUT body; TLS already
+# protects the bytes. Plain-http endpoints keep the signed payload hash, except the
+# presigned sendfile PUT (see sendfile_put), which signs a Content-MD5 instead.
+S3_OPTIONS = {"addressing_style": "path"}
+if WASABI_ENDPOINT.lower().startswith("https://"):
+    S3_OPTIONS["payload_signing_enabled"] = False
+
+S3_CONFIG = Config(
+    signature_version="s3v4",
+    s3=S3_OPTIONS,
+    max_pool_connections=MAX_POOL,
+    retries={"mode": "standard", "max_attempts": RETRY_ATTEMPTS},
+    tcp_keepalive=True,
 )
 
-# --- Startup auth doctor (run once) ---
-print("DEBUG endpoint host:", getattr(s3, "_endpoint", None).host, flush=True)
-print("DEBUG region:", WASABI_REGION, flush=True)
-print("DEBUG access key:", _mask(WASABI_ACCESS_KEY), "len:", len(WASABI_ACCESS_KEY), flush=True)
-print("DEBUG secret len:", len(WASABI_SECRET_KEY), flush=True)
+# Build a dedicated session so nothing else leaks in
+def _build_client():
+    session: Session = boto3.session.Session(
+        aws_access_key_id=WASABI_ACCESS_KEY.strip(),
+        aws_secret_access_key=WASABI_SECRET_KEY.strip(),
+        region_name=WASABI_REGION.strip(),
+    )
+    return session.client("s3", endpoint_url=WASABI_ENDPOINT.strip(), config=S3_CONFIG)
+
+s3 = _build_client()
+_ep = getattr(s3, "_endpoint", None)
+ENDPOINT_HOST = _ep.host if _ep else WASABI_ENDPOINT
+
+# Multipart uploads: parts above 8 MiB go out in parallel over several connections
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=MAX_POOL,
+    use_threads=True,
+)
+# One manager (and one worker pool) shared by every request, so concurrent uploads
+# overlap their S3 I/O instead of each spinning up threads of its own; one thread per
+# pooled connection keeps the whole pool busy
+TRANSFER_MANAGER = create_transfer_manager(s3, TRANSFER_CONFIG)
+
+# Above this size (Linux only), parts are sent from forked worker processes so the
+# socket-write path isn't bound by this process's GIL
+SHARED_UPLOAD_THRESHOLD = 100 * 1024 * 1024
+SHARED_UPLOAD = sys.platform.startswith("linux")
+# Longest a single part may run (time queued behind other uploads doesn't count)
+PART_TIMEOUT = 300
+# S3 rejects multipart uploads with more parts than this
+MAX_PARTS = 10000
+
+# Mirrors Werkzeug's file spool threshold (default_stream_factory): larger uploads are
+# already on disk, so only they can take the sendfile path
+SPOOL_LIMIT = 500 * 1024
+
+# Plain-http endpoints only (e.g. a local gateway): bodies already spooled to disk, up to
+# SHARED_UPLOAD_THRESHOLD, are PUT with os.sendfile, copying kernel-to-kernel. TLS needs
+# user space; anything larger goes multipart, well clear of S3's 5 GiB single-PUT limit.
+SENDFILE_UPLOAD = hasattr(os, "sendfile") and WASABI_ENDPOINT.lower().startswith("http://")
+
+# --- Startup auth doctor (run once; LOG_LEVEL=DEBUG to see it) ---
+logger.debug("endpoint host: %s", ENDPOINT_HOST)
+logger.debug("region: %s", WASABI_REGION)
+logger.debug("access key: %s len: %d", _mask(WASABI_ACCESS_KEY), len(WASABI_ACCESS_KEY))
+logger.debug("secret len: %d", len(WASABI_SECRET_KEY))
+# Hashes still computed (SigV4, checksums) should come from OpenSSL, which uses SHA-NI/ARMv8 SHA
+if type(hashlib.sha256()).__module__ != "_hashlib":
+    logger.warning("hashlib.sha256 is not OpenSSL-backed; signing falls back to slow builtin SHA-256")
 
 def _err_text(e: ClientError) -> str:
     try:
@@ -71,21 +174,21 @@ def _err_text(e: ClientError) -> str:
 def auth_ok() -> tuple[bool, str | None]:
     try:
         s3.list_buckets()
-        print("DEBUG AUTH: OK (keys recognized by Wasabi)", flush=True)
+        logger.debug("AUTH: OK (keys recognized by Wasabi)")
         return True, None
     except ClientError as e:
         msg = _err_text(e)
-        print("DEBUG AUTH: FAILED ->", msg, flush=True)
+        logger.warning("AUTH: FAILED -> %s", msg)
         return False, msg
 
 def preflight_bucket() -> str | None:
     try:
         s3.head_bucket(Bucket=WASABI_BUCKET)
-        print("DEBUG head_bucket OK for", WASABI_BUCKET, flush=True)
+        logger.debug("head_bucket OK for %s", WASABI_BUCKET)
         return None
     except ClientError as e:
         err = _err_text(e)
-        print("DEBUG head_bucket error:", err, flush=True)
+        logger.warning("head_bucket error: %s", err)
         if "NoSuchBucket" in err or "404" in err:
             return ("Bucket not found. Check spelling and region. "
                     f"(bucket={WASABI_BUCKET!r}, region={WASABI_REGION}, endpoint={WASABI_ENDPOINT})")
@@ -97,20 +200,196 @@ def preflight_bucket() -> str | None:
 
 # One-time diagnostic put (tiny object) to prove PutObject works
 def diag_put() -> str | None:
-    test_key = f"diag/{uuid.uuid4()}.txt"
+    test_key = f"diag/{secrets.token_urlsafe(16)}.txt"
     try:
         s3.put_object(Bucket=WASABI_BUCKET, Key=test_key, Body=b"diag", ContentType="text/plain")
-        print("DEBUG diag_put OK ->", test_key, flush=True)
-        return None
+        logger.debug("diag_put OK -> %s", test_key)
     except ClientError as e:
         err = _err_text(e)
-        print("DEBUG diag_put error:", err, flush=True)
+        logger.warning("diag_put error: %s", err)
         return err
+    # Best effort: keys without s3:DeleteObject still pass the diagnostic
+    try:
+        s3.delete_object(Bucket=WASABI_BUCKET, Key=test_key)
+    except ClientError as e:
+        logger.warning("diag_put cleanup error: %s", _err_text(e))
+    return None
+
+# Sweep diag probes left behind by older versions that probed on every upload. Only keys
+# matching the probe names (uuid4 or token_urlsafe(16)) are touched, 1000 per request.
+_DIAG_KEY_RE = re.compile(r"diag/(?:[0-9a-f-]{36}|[A-Za-z0-9_-]{22})\.txt")
+
+def cleanup_diag() -> None:
+    try:
+        pages = s3.get_paginator("list_objects_v2").paginate(Bucket=WASABI_BUCKET, Prefix="diag/")
+        for page in pages:
+            keys = [{"Key": o["Key"]} for o in page.get("Contents", []) if _DIAG_KEY_RE.fullmatch(o["Key"])]
+            if not keys:
+                continue
+            resp = s3.delete_objects(Bucket=WASABI_BUCKET, Delete={"Objects": keys, "Quiet": True})
+            logger.debug("cleanup_diag deleted %d probe(s)", len(keys) - len(resp.get("Errors", [])))
+            for err in resp.get("Errors", []):
+                logger.warning("cleanup_diag error: %s %s: %s", err.get("Key"), err.get("Code"), err.get("Message"))
+    except ClientError as e:
+        logger.warning("cleanup_diag error: %s", _err_text(e))
+
+# Sign GETs with the client's own RequestSigner, skipping the public API's per-call
+# model/serializer walk; the URL and SigV4 signature match generate_presigned_url
+_SIGNER = s3._request_signer
+_OBJECT_URL = f"{s3.meta.endpoint_url.rstrip('/')}/{WASABI_BUCKET}/"
+
+def presign_get(key: str, expires_in: int = 3600) -> str:
+    request_dict = {
+        "url_path": "", "query_string": {}, "method": "GET", "headers": {}, "body": b"",
+        "url": _OBJECT_URL + urllib.parse.quote(key, safe="/~"), "context": {},
+    }
+    return _SIGNER.generate_presigned_url(request_dict, "GetObject", expires_in=expires_in)
+
+# --- Process-parallel multipart upload for large files ---
+_part_client = None
+
+def _init_part_worker() -> None:
+    # Clients aren't fork-safe, so every worker builds its own
+    global _part_client
+    _part_client = _build_client()
+
+def _upload_part(args: tuple[int, str, str, int, int, int]) -> dict:
+    fd, key, upload_id, part_number, offset, length = args
+    # Workers are forked before any upload exists, so reach the parent's spooled
+    # (possibly unlinked) temp file through /proc; pread leaves its offset alone
+    with open(f"/proc/{os.getppid()}/fd/{fd}", "rb") as fh:
+        body = os.pread(fh.fileno(), length, offset)
+    resp = _part_client.upload_part(
+        Bucket=WASABI_BUCKET, Key=key, UploadId=upload_id,
+        PartNumber=part_number, Body=body,
+    )
+    part = {"PartNumber": part_number, "ETag": resp["ETag"]}
+    for name in ("ChecksumCRC32", "ChecksumCRC32C", "ChecksumSHA1", "ChecksumSHA256"):
+        if name in resp:
+            part[name] = resp[name]
+    return part
+
+def _wait_parts(futures: list) -> list[dict]:
+    # Uploads share one queue, so time each part from when it starts running
+    started = {}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=5, return_when=FIRST_COMPLETED)
+        for fut in done:
+            fut.result()  # surface a failed part right away
+        now = time.monotonic()
+        for fut in pending:
+            if fut.running() and now - started.setdefault(fut, now) > PART_TIMEOUT:
+                raise FuturesTimeoutError(f"part running for over {PART_TIMEOUT}s")
+    return [fut.result() for fut in futures]
+
+# Pool-level failures: a worker hung or died, or the pool is no longer usable
+_POOL_FAILURES = (FuturesTimeoutError, BrokenProcessPool, CancelledError, RuntimeError)
+
+def multipart_upload_shared(key: str, fileobj, size: int, content_type: str) -> None:
+    global SHARED_UPLOAD
+    fd = fileobj.fileno()
+    chunk = max(TRANSFER_CONFIG.multipart_chunksize, math.ceil(size / MAX_PARTS))
+    upload_id = s3.create_multipart_upload(Bucket=WASABI_BUCKET, Key=key, ContentType=content_type)["UploadId"]
+    futures = []
+    try:
+        for n, off in enumerate(range(0, size, chunk)):
+            part = (fd, key, upload_id, n + 1, off, min(chunk, size - off))
+            futures.append(PART_EXECUTOR.submit(_upload_part, part))
+        s3.complete_multipart_upload(
+            Bucket=WASABI_BUCKET, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": _wait_parts(futures)},
+        )
+        return
+    except BaseException as e:
+        # Only this upload's parts; other uploads may still be using the pool
+        for fut in futures:
+            fut.cancel()
+        s3.abort_multipart_upload(Bucket=WASABI_BUCKET, Key=key, UploadId=upload_id)
+        if not isinstance(e, _POOL_FAILURES):
+            raise
+        # Never re-fork from this threaded process: later large uploads use threads
+        SHARED_UPLOAD = False
+        logger.warning("part workers failed (%r); large uploads fall back to threads", e)
+    # Retry this upload on the threaded transfer manager
+    fileobj.seek(0)
+    TRANSFER_MANAGER.upload(fileobj, WASABI_BUCKET, key, extra_args={"ContentType": content_type}).result()
+
+# Fork every worker now, while this process is still single-threaded (before waitress
+# and the transfer manager start theirs); the pool never re-forks later
+if SHARED_UPLOAD:
+    PART_EXECUTOR = ProcessPoolExecutor(
+        os.cpu_count() or 1, mp_context=mp.get_context("fork"), initializer=_init_part_worker,
+    )
+    PART_EXECUTOR.submit(int).result()
+
+# --- Zero-copy single PUT for plain-http endpoints ---
+def _file_md5(fileobj, size: int) -> str:
+    md5 = hashlib.md5(usedforsecurity=False)
+    for offset in range(0, size, 1024 * 1024):
+        md5.update(os.pread(fileobj.fileno(), 1024 * 1024, offset))
+    return base64.b64encode(md5.digest()).decode()
 
-# Run startup checks
+def _sendfile_once(url: urllib.parse.SplitResult, fileobj, size: int, content_type: str, content_md5: str) -> tuple[int, str, bytes]:
+    conn = HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    try:
+        conn.putrequest("PUT", f"{url.path}?{url.query}", skip_accept_encoding=True)
+        conn.putheader("Content-Type", content_type)
+        conn.putheader("Content-MD5", content_md5)
+        conn.putheader("Content-Length", str(size))
+        conn.endheaders()
+        conn.sock.sendfile(fileobj, 0, size)
+        resp = conn.getresponse()
+        return resp.status, resp.reason, resp.read()
+    finally:
+        conn.close()
+
+def sendfile_put(key: str, fileobj, size: int, content_type: str) -> None:
+    # A presigned URL carries UNSIGNED-PAYLOAD, so sign a Content-MD5 for S3 to verify the body
+    content_md5 = _file_md5(fileobj, size)
+    url = urllib.parse.urlsplit(s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": WASABI_BUCKET, "Key": key, "ContentType": content_type, "ContentMD5": content_md5},
+        ExpiresIn=300,
+    ))
+    # Retry resets and 5xx like botocore's standard mode (jittered exponential backoff)
+    for attempt in range(RETRY_ATTEMPTS):
+        if attempt:
+            time.sleep(random.random() * min(20, 2 ** attempt))
+        try:
+            status, reason, body = _sendfile_once(url, fileobj, size, content_type, content_md5)
+        except OSError as e:
+            logger.warning("sendfile_put attempt %d failed: %r", attempt + 1, e)
+            status, reason, body = None, repr(e), b""
+            continue
+        if status < 500:
+            break
+        logger.warning("sendfile_put attempt %d got HTTP %d", attempt + 1, status)
+    if status == 200:
+        return
+    code, msg = str(status or "ConnectionError"), reason
+    try:
+        err = ElementTree.fromstring(body)
+        code, msg = err.findtext("Code") or code, err.findtext("Message") or msg
+    except ElementTree.ParseError:
+        pass
+    raise ClientError({"Error": {"Code": code, "Message": msg}}, "PutObject")
+
+# Secret for POST /?debug=<token>, which re-runs the bucket checks; unset disables it
+DEBUG_TOKEN = _env("WASABI_DEBUG_TOKEN")
+
+# Run startup checks (once; see DEBUG_TOKEN for re-running the bucket checks).
+# They also open the first keep-alive TLS connection, so the first upload skips the handshake.
 _auth_ok, _auth_err = auth_ok()
+_preflight_err = preflight_bucket() if _auth_ok else None
+_diag_err = diag_put() if _auth_ok and not _preflight_err else None
+# One-off, opt-in: set WASABI_CLEANUP_DIAG=1 for a single start to sweep old probes
+if _auth_ok and not _preflight_err and _env("WASABI_CLEANUP_DIAG") == "1":
+    cleanup_diag()
 
 app = Flask(__name__)
+# f.stream is handed straight to S3, so cap the request body
+app.config["MAX_CONTENT_LENGTH"] = int(_env("MAX_UPLOAD_BYTES", default=str(5 * 1024 ** 3)))
 
 HTML = """
 <!doctype html>
@@ -203,7 +482,7 @@ HTML = """
         <div class="err"><b>Startup error:</b> {{ startup_error }}</div>
       {% endif %}
 
-      <form id="uploadForm" method="POST" enctype="multipart/form-data" action="{{ url_for('index') }}">
+      <form id="uploadForm" method="POST" enctype="multipart/form-data">
         <label id="dropzone" class="dz" for="fileInput">
           <span class="icon"></span>
           <h3>Choose a file</h3>
@@ -272,73 +551,122 @@ HTML = """
 </html>
 """
 
+# Object-key filename sanitiser (S3 keys, not filesystem paths, so no unicode/reserved-name pass)
+_SAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Compile once; badges never change after startup
+TEMPLATE = app.jinja_env.from_string(HTML)
+BADGES = {"endpoint": ENDPOINT_HOST, "region": WASABI_REGION, "bucket": WASABI_BUCKET}
+
+
+@app.get("/")
+def index_get():
+    # Identical for every visitor, so revalidate with the ETag instead of re-rendering
+    if request.accept_encodings["gzip"] > 0:
+        resp = Response(_CACHED_GZIP, mimetype="text/html")
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.set_etag(_ETAG + "-gz")
+    else:
+        resp = Response(_CACHED_GET_HTML, mimetype="text/html")
+        resp.set_etag(_ETAG)
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = "private, max-age=60"
+    return resp.make_conditional(request)
+
+
+@app.post("/")
+def index_post():
+    global _preflight_err, _diag_err
 
-@app.route("/", methods=["GET", "POST"])
-def index():
     # If auth failed at startup, show that immediately
     if not _auth_ok:
-        return render_template_string(
-            HTML, url=None, error=None, startup_error=_auth_err,
-            endpoint=getattr(s3, "_endpoint", None).host, region=WASABI_REGION, bucket=WASABI_BUCKET
-        )
+        return _CACHED_GET_HTML
 
     url = None
     error = None
 
-    if request.method == "POST":
-        # Bucket reachable?
+    # Operators (?debug=<WASABI_DEBUG_TOKEN>) can re-run the startup checks. A passing
+    # re-check clears the stored errors; a failing one is only reported to that request.
+    token = request.args.get("debug")
+    if DEBUG_TOKEN and token and secrets.compare_digest(token.encode(), DEBUG_TOKEN.encode()):
         pre = preflight_bucket()
         if pre:
-            return render_template_string(
-                HTML, url=None, error=f"Bucket check failed: {pre}", startup_error=None,
-                endpoint=getattr(s3, "_endpoint", None).host, region=WASABI_REGION, bucket=WASABI_BUCKET
-            )
-
-        # Can we put a tiny object?
+            return _error_page(f"Bucket check failed: {pre}")
         d = diag_put()
         if d:
-            return render_template_string(
-                HTML, url=None, error=f"Diagnostic PutObject failed: {d}", startup_error=None,
-                endpoint=getattr(s3, "_endpoint", None).host, region=WASABI_REGION, bucket=WASABI_BUCKET
-            )
-
-        # Real upload
-        f = request.files.get("file")
-        if not f:
-            error = "No file selected."
+            return _error_page(f"Diagnostic PutObject failed: {d}")
+        _preflight_err = _diag_err = None
+
+    # Bucket reachable?
+    if _preflight_err:
+        return _error_page(f"Bucket check failed: {_preflight_err}")
+
+    # Can we put a tiny object?
+    if _diag_err:
+        return _error_page(f"Diagnostic PutObject failed: {_diag_err}")
+
+    # Real upload
+    f = request.files.get("file")
+    if not f:
+        error = "No file selected."
+    else:
+        fname = _SAFE_RE.sub("_", os.path.basename(f.filename or "")).strip("._")[:128]
+        if not fname:
+            error = "Invalid filename."
         else:
-            fname = secure_filename(f.filename)
-            if not fname:
-                error = "Invalid filename."
-            else:
-                key = f"uploads/{uuid.uuid4()}_{fname}"
-                try:
-                    f.stream.seek(0)
-                    data = f.stream.read()
-                    s3.put_object(
-                        Bucket=WASABI_BUCKET,
-                        Key=key,
-                        Body=data,
-                        ContentType=f.mimetype or "application/octet-stream",
-                    )
-                    url = s3.generate_presigned_url(
-                        "get_object",
-                        Params={"Bucket": WASABI_BUCKET, "Key": key},
-                        ExpiresIn=3600,
-                    )
-                except ClientError as e:
-                    error = _err_text(e)
-
-    return render_template_string(
-        HTML,
-        url=url,
-        error=error,
-        startup_error=None,
-        endpoint=getattr(s3, "_endpoint", None).host if getattr(s3, "_endpoint", None) else WASABI_ENDPOINT,
-        region=WASABI_REGION,
-        bucket=WASABI_BUCKET,
-    )
+            key = f"uploads/{secrets.token_urlsafe(16)}_{fname}"
+            content_type = f.headers.get("Content-Type", "").split(";", 1)[0].strip() or "application/octet-stream"
+            size = f.stream.seek(0, os.SEEK_END)
+            f.stream.seek(0)
+            try:
+                if SHARED_UPLOAD and size > SHARED_UPLOAD_THRESHOLD:
+                    multipart_upload_shared(key, f.stream, size, content_type)
+                elif SENDFILE_UPLOAD and SPOOL_LIMIT < size <= SHARED_UPLOAD_THRESHOLD:
+                    sendfile_put(key, f.stream, size, content_type)
+                else:
+                    # Hand over the stream itself: s3transfer reads it chunk by chunk, so the
+                    # file is never materialised as one bytes object (botocore rejects memoryview)
+                    TRANSFER_MANAGER.upload(
+                        f.stream,
+                        WASABI_BUCKET,
+                        key,
+                        extra_args={"ContentType": content_type},
+                    ).result()
+                url = presign_get(key)
+            except ClientError as e:
+                error = _err_text(e)
+
+    if error:
+        return _error_page(error)
+    return TEMPLATE.render(**BADGES, url=url, error=None, startup_error=None)
+
+
+# Error pages differ only in the message, so fill a pre-rendered shell instead of running Jinja
+_ERR_SENTINEL = "__WASABI_UPLOADER_ERROR__"
+
+def _error_page(msg: str) -> Response:
+    return Response(_ERR_SHELL.replace(_ERR_SENTINEL, html.escape(msg)), mimetype="text/html")
+
+
+# Pre-render the GET page and error shell once; the form has no action, so it posts back
+# to whatever URL served it and works under a reverse-proxy path prefix
+_CACHED_GET_HTML = TEMPLATE.render(
+    **BADGES, url=None, error=None, startup_error=None if _auth_ok else _auth_err
+)
+_ERR_SHELL = TEMPLATE.render(**BADGES, url=None, error=_ERR_SENTINEL, startup_error=None)
+_ETAG = hashlib.blake2b(_CACHED_GET_HTML.encode("utf-8"), digest_size=8).hexdigest()
+_CACHED_GZIP = gzip.compress(_CACHED_GET_HTML.encode("utf-8"), compresslevel=9)
 
 if __name__ == "__main__":
-    # Windows: avoid port conflicts & double-binding
-    app.run(host="127.0.0.1", port=5050, debug=True, use_reloader=False)
+    # Production WSGI server (works on Windows too); threads overlap uploads.
+    # waitress receives request bodies on its async I/O loop and only hands a request
+    # to a worker thread once fully buffered, so slow clients don't pin threads.
+    from waitress import serve
+    serve(
+        app,
+        host="127.0.0.1",
+        port=5050,
+        threads=16,
+        connection_limit=int(_env("WASABI_MAX_CONNECTIONS", default="500")),
+        max_request_body_size=app.config["MAX_CONTENT_LENGTH"],
+    )